@@ -29,10 +29,52 @@ def get_digital_recording(time: float) -> Tuple[np.ndarray, int]:
         the sampling rate used.
     """
     frames, sample_rate = record_audio(time)
-    digital_data = np.hstack([np.frombuffer(i, np.int16) for i in frames])
+
+    # Copy each frame into one preallocated buffer rather than np.hstack over
+    # a list of tiny per-frame arrays, which allocates every wrapper and then
+    # copies everything a second time into the concatenated result.
+    total_samples = sum(len(frame) for frame in frames) // np.dtype(np.int16).itemsize
+    digital_data = np.empty(total_samples, dtype=np.int16)
+    offset = 0
+    for frame in frames:
+        frame_samples = np.frombuffer(frame, np.int16)
+        digital_data[offset : offset + len(frame_samples)] = frame_samples
+        offset += len(frame_samples)
     return digital_data, sample_rate
 
 
+def random_clips(
+    samples: np.ndarray, num_clips: int = 3, clip_length: int = defaults.SAMPLING_RATE
+) -> np.ndarray:
+    """
+    Extract clips from random locations in a recording.
+
+    All of the clips are gathered with a single fancy-index: the random start
+    offsets broadcast against an arange of within-clip offsets, so no
+    Python-level loop or per-clip slice is made.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray, shape-(N,)
+        The digital samples to draw clips from.
+
+    num_clips : int, optional (default=3)
+        The number of clips to extract.
+
+    clip_length : int, optional (global default provided)
+        The length of each clip, in samples. The default is one second's
+        worth at the default sampling rate.
+
+    Returns
+    -------
+    numpy.ndarray, shape-(num_clips, clip_length)
+        The extracted clips, one per row. Clips may overlap one another.
+    """
+    assert len(samples) >= clip_length
+    starts = np.random.randint(0, len(samples) - clip_length + 1, size=num_clips)
+    return samples[starts[:, None] + np.arange(clip_length)]
+
+
 def load_song_file(
     path_to_song_file: Union[Path, str], sampling_rate: int = defaults.SAMPLING_RATE
 ) -> Tuple[np.ndarray, int]:
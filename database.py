@@ -2,9 +2,13 @@
 Our "database" simply consists of two parts 
 
 1) fp_lookup: A default-dict that stores:
-    - key: (freq_m, freq_n, (t_n - t_m))
+    - key: (freq_m, freq_n, (t_n - t_m)) packed into a single 64-bit int
+      (see fingerprints.pack_fingerprint)
     - value: [(song-ID, t_m), ....]
 
+    `finalize_database` converts each value to a pair of parallel int32
+    arrays, (song-IDs, t_ms), once all songs have been added.
+
     Note that all frequencies and times are actually integer-valued
     indices associated without our spectrogram's bins. We don't store
     the actual time/frequency values in seconds/Hz.
@@ -18,21 +22,40 @@ Basic functions for working with our song database.
 - record audio for a mic and return its best match from the db
 """
 
+import mmap
 import pickle
-from collections import Counter, defaultdict
+import sqlite3
+from collections import defaultdict
 from pathlib import Path
-from typing import Any, DefaultDict, Dict, Iterable, List, NamedTuple, Tuple, Union
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 from typing_extensions import TypeAlias
 
 import numpy as np
 
 SongId: TypeAlias = Any
 
+# A fingerprint bucket is either a list of (song-ID, t1) tuples -- while the
+# database is being built -- or, after `finalize_database`, a pair of parallel
+# contiguous int32 arrays (song-IDs, t1s). The latter struct-of-arrays layout
+# lets the matcher process a whole bucket with vectorized NumPy ops instead of
+# hopping through two Python objects per entry.
+FpBucket: TypeAlias = Union[List[Tuple[SongId, int]], Tuple[np.ndarray, np.ndarray]]
+
 # This is simply a named-tuple that includes type-annotations
 # for its fields
 class Database(NamedTuple):
-    # (f1, f2, dt_12) -> [(song-ID, t1), ...]
-    fp_lookup: DefaultDict[Tuple[int, int, int], List[Tuple[SongId, int]]]
+    # pack_fingerprint(f1, f2, dt_12) -> bucket of (song-ID, t1) entries
+    fp_lookup: Dict[int, FpBucket]
     song_id_to_name: Dict[SongId, str]
 
 
@@ -40,16 +63,237 @@ def create_database() -> Database:
     return Database(fp_lookup=defaultdict(list), song_id_to_name=dict())
 
 
+def finalize_database(db: Database) -> Database:
+    """Convert every fingerprint bucket from a list of (song-ID, t1) tuples
+    to a pair of parallel int32 arrays: (song-IDs, t1s).
+
+    Best called once all songs have been added: songs can still be added to a
+    finalized database, but each affected array bucket is then rebuilt by
+    concatenation, which is slower than the list-bucket appends. Matching
+    works on either layout, and is faster on a finalized one.
+
+    Parameters
+    ----------
+    db : Database
+
+    Returns
+    -------
+    db : Database
+        A database with struct-of-arrays fingerprint buckets."""
+    fp_lookup: Dict[int, FpBucket] = {}
+    for f1_f2_dt, bucket in db.fp_lookup.items():
+        if isinstance(bucket, tuple):
+            # this bucket was already finalized
+            fp_lookup[f1_f2_dt] = bucket
+            continue
+        fp_lookup[f1_f2_dt] = (
+            np.asarray([s_id for s_id, _ in bucket], dtype=np.int32),
+            np.asarray([t1 for _, t1 in bucket], dtype=np.int32),
+        )
+    return Database(fp_lookup=fp_lookup, song_id_to_name=db.song_id_to_name)
+
+
 def save_db(db: Database, path: Union[str, Path]):
+    """Save the database in a compact array-backed binary format.
+
+    `fp_lookup` is flattened CSR-style into three arrays -- the packed keys,
+    the per-bucket offsets into the value array, and one big array of
+    interleaved (song-ID, t1) int32 pairs -- and pickled with protocol 5,
+    whose out-of-band buffers write each array as raw bytes. This replaces
+    pickling millions of per-entry tuples and boxed ints, which dominated
+    both file size and (de)serialization time.
+    """
+    fp_lookup = db.fp_lookup
+    num_buckets = len(fp_lookup)
+
+    # packed keys use all 64 bits, so they are stored unsigned
+    keys = np.empty(num_buckets, dtype=np.uint64)
+    offsets = np.empty(num_buckets + 1, dtype=np.int64)
+    offsets[0] = 0
+    for i, (f1_f2_dt, bucket) in enumerate(fp_lookup.items()):
+        keys[i] = f1_f2_dt
+        size = len(bucket[0]) if isinstance(bucket, tuple) else len(bucket)
+        offsets[i + 1] = offsets[i] + size
+
+    values = np.empty(2 * int(offsets[-1]), dtype=np.int32)
+    pos = 0
+    for bucket in fp_lookup.values():
+        if isinstance(bucket, tuple):
+            s_ids, t1s = bucket
+        else:
+            s_ids = [s_id for s_id, _ in bucket]
+            t1s = [t1 for _, t1 in bucket]
+        end = pos + 2 * len(s_ids)
+        values[pos:end:2] = s_ids
+        values[pos + 1 : end : 2] = t1s
+        pos = end
+
+    pickled_buffers: List[pickle.PickleBuffer] = []
+    payload = pickle.dumps(
+        {
+            "keys": keys,
+            "offsets": offsets,
+            "values": values,
+            "song_id_to_name": db.song_id_to_name,
+        },
+        protocol=5,
+        buffer_callback=pickled_buffers.append,
+    )
+    raw_buffers = [b.raw() for b in pickled_buffers]
     with open(path, "wb") as f:
-        # convert named tuple to "vanilla" tuple before saving
-        pickle.dump(tuple(db), f)
+        # a small header locating the payload and each out-of-band buffer
+        pickle.dump((len(payload), [len(raw) for raw in raw_buffers]), f)
+        f.write(payload)
+        for raw in raw_buffers:
+            f.write(raw)
 
 
 def load_db(path: Union[str, Path]) -> Database:
+    """Load a database written by `save_db`.
+
+    The file is memory-mapped and the CSR arrays are reconstructed zero-copy
+    on top of the mapping, so loading costs no per-entry deserialization and
+    the OS pages in only the parts of the value array that queries actually
+    touch. Each bucket comes back as a finalized (song-IDs, t1s) array pair
+    viewing the shared value array.
+
+    Databases pickled by the old format (the whole dict as one object) are
+    detected and still load.
+    """
     with open(path, "rb") as f:
-        # convert vanilla tuple to named tuple upon loading
-        return Database(*pickle.load(f))
+        header = pickle.load(f)
+        if isinstance(header[0], dict):
+            from fingerprints import pack_fingerprint
+
+            # legacy format: (fp_lookup, song_id_to_name) pickled directly.
+            # Files from before fingerprint keys were packed hold (f1, f2, dt)
+            # tuple keys, which today's lookups would silently miss -- repack
+            # them in one pass. A defaultdict keeps the result add-friendly.
+            legacy_fp_lookup, song_id_to_name = header
+            fp_lookup = defaultdict(list)
+            for key, bucket in legacy_fp_lookup.items():
+                if isinstance(key, tuple):
+                    key = pack_fingerprint(*key)
+                fp_lookup[key] = bucket
+            return Database(fp_lookup=fp_lookup, song_id_to_name=song_id_to_name)
+        payload_len, buffer_lens = header
+        data_start = f.tell()
+        mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    payload = mapped[data_start : data_start + payload_len]
+    buffers = []
+    pos = data_start + payload_len
+    for buffer_len in buffer_lens:
+        buffers.append(mapped[pos : pos + buffer_len])
+        pos += buffer_len
+    arrays = pickle.loads(payload, buffers=buffers)
+
+    keys = arrays["keys"].tolist()
+    offsets = arrays["offsets"].tolist()
+    values = arrays["values"]
+    fp_lookup: Dict[int, FpBucket] = {}
+    for i, f1_f2_dt in enumerate(keys):
+        start, end = 2 * offsets[i], 2 * offsets[i + 1]
+        fp_lookup[f1_f2_dt] = (values[start:end:2], values[start + 1 : end : 2])
+    return Database(fp_lookup=fp_lookup, song_id_to_name=arrays["song_id_to_name"])
+
+
+def _as_sqlite_int(key: int) -> int:
+    """Map a 64-bit packed fingerprint to SQLite's signed-int64 range.
+
+    Packed keys use all 64 bits, but SQLite INTEGERs are signed; keys with
+    the top bit set are wrapped to their two's-complement value."""
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+class _SqliteFpLookup:
+    """A read-only, on-disk stand-in for the `fp_lookup` dict, backed by a
+    SQLite table keyed on the packed fingerprint.
+
+    Only the buckets a query actually touches are read from disk, so a
+    database far larger than RAM can be searched without ever loading it:
+    `.get` returns the same (song-IDs, t1s) array pair as a finalized
+    in-memory bucket, decoded straight from the stored blob."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    def get(self, f1_f2_dt: int, default=None):
+        row = self._connection.execute(
+            "SELECT hits FROM fp_lookup WHERE key = ?",
+            (_as_sqlite_int(int(f1_f2_dt)),),
+        ).fetchone()
+        if row is None:
+            return default
+        # the blob holds interleaved (song-ID, t1) int32 pairs
+        pairs = np.frombuffer(row[0], dtype=np.int32)
+        return pairs[0::2], pairs[1::2]
+
+
+def save_db_sqlite(db: Database, path: Union[str, Path]):
+    """Write the database to a SQLite file for on-disk querying.
+
+    Each fingerprint bucket becomes one row: the packed key, and a blob of
+    interleaved (song-ID, t1) int32 pairs. Use `load_db_sqlite` to query the
+    result without loading it into memory.
+
+    Parameters
+    ----------
+    db : Database
+
+    path : str | Path"""
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.execute("DROP TABLE IF EXISTS fp_lookup")
+            connection.execute("DROP TABLE IF EXISTS songs")
+            connection.execute(
+                "CREATE TABLE fp_lookup (key INTEGER PRIMARY KEY, hits BLOB)"
+            )
+            connection.execute(
+                "CREATE TABLE songs (song_id INTEGER PRIMARY KEY, name TEXT)"
+            )
+
+            def bucket_rows():
+                for f1_f2_dt, bucket in db.fp_lookup.items():
+                    if isinstance(bucket, tuple):
+                        s_ids, t1s = bucket
+                    else:
+                        s_ids = [s_id for s_id, _ in bucket]
+                        t1s = [t1 for _, t1 in bucket]
+                    pairs = np.empty(2 * len(s_ids), dtype=np.int32)
+                    pairs[0::2] = s_ids
+                    pairs[1::2] = t1s
+                    yield _as_sqlite_int(int(f1_f2_dt)), pairs.tobytes()
+
+            connection.executemany("INSERT INTO fp_lookup VALUES (?, ?)", bucket_rows())
+            connection.executemany(
+                "INSERT INTO songs VALUES (?, ?)", db.song_id_to_name.items()
+            )
+    finally:
+        connection.close()
+
+
+def load_db_sqlite(path: Union[str, Path]) -> Database:
+    """Open a SQLite-backed database for querying.
+
+    Only `song_id_to_name` (a handful of rows) is read eagerly; fingerprint
+    buckets are fetched from disk as queries touch them. The returned
+    database is read-only -- add/delete/finalize require the pickled
+    in-memory form.
+
+    Parameters
+    ----------
+    path : str | Path
+
+    Returns
+    -------
+    db : Database"""
+    connection = sqlite3.connect(path)
+    song_id_to_name = dict(connection.execute("SELECT song_id, name FROM songs"))
+    return Database(
+        fp_lookup=_SqliteFpLookup(connection), song_id_to_name=song_id_to_name
+    )
 
 
 def add_song_to_database(
@@ -73,42 +317,176 @@ def add_song_to_database(
     Returns
     -------
     db : Database"""
-    from fingerprints import digital_to_spec, local_peaks, peaks_to_fingerprints
-
-    # This doesn't check to see if the song already exists in our database
-    # If it does, then we will simply have multiple song-IDs pointing to
-    # the same song name
-
-    # Generate song-ID simply based off how many other songs are in the DB
-    # (not safe if we ever delete a song from the database!)
-    new_song_id = len(db.song_id_to_name)
+    from fingerprints import digital_to_spec, local_peaks, peaks_to_fingerprint_arrays
+
+    if isinstance(db.fp_lookup, _SqliteFpLookup):
+        raise ValueError(
+            "cannot add songs to a SQLite-backed database -- it is read-only; "
+            "add to an in-memory database and re-save it with save_db_sqlite"
+        )
+
+    # Refuse duplicate adds. A song is identified by its name here, and
+    # membership is checked against `song_id_to_name` -- never by scanning
+    # the fingerprint buckets in `fp_lookup`, which would cost
+    # O(num-songs x num-fingerprints) per add.
+    if song_name in db.song_id_to_name.values():
+        return db
+
+    # Generate song-ID as one past the largest ID currently in the DB, so it
+    # never collides with a live song. An ID *can* be re-issued after the
+    # highest-ID song is deleted -- harmless here, since
+    # delete_song_from_database scrubs every fingerprint entry for the
+    # deleted ID, but don't treat song-IDs as unique across deletions.
+    new_song_id = max(db.song_id_to_name, default=-1) + 1
 
     log_spec, threshold_amp = digital_to_spec(song_samples, sample_rate)
     time_freq_peak_locations = local_peaks(log_spec, threshold_amp)
 
-    for f1_f2_dt, t1 in peaks_to_fingerprints(time_freq_peak_locations):
-        db.fp_lookup[f1_f2_dt].append((new_song_id, t1))
+    # the fan-out pairing and key-packing happen in bulk NumPy ops
+    keys, t1s = peaks_to_fingerprint_arrays(time_freq_peak_locations)
+
+    # Group the fingerprints by key before touching the dict: a stable sort
+    # plus np.unique collapses the per-fingerprint appends into one bucket
+    # extension per distinct key, cutting the dict interactions roughly
+    # tenfold for typical fan-outs. The stable sort preserves each key's
+    # time-ordering of t1 values.
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    sorted_t1s = t1s[order]
+    unique_keys, starts = np.unique(sorted_keys, return_index=True)
+    ends = np.append(starts[1:], len(sorted_keys))
+
+    fp_lookup = db.fp_lookup
+    for f1_f2_dt, start, end in zip(
+        unique_keys.tolist(), starts.tolist(), ends.tolist()
+    ):
+        bucket = fp_lookup.get(f1_f2_dt)
+        if bucket is None:
+            fp_lookup[f1_f2_dt] = [
+                (new_song_id, t1) for t1 in sorted_t1s[start:end].tolist()
+            ]
+        elif isinstance(bucket, tuple):
+            # finalized bucket (e.g. from a database loaded via `load_db`):
+            # extend the (song-IDs, t1s) array pair by concatenation
+            s_ids, t1s_arr = bucket
+            group = sorted_t1s[start:end]
+            fp_lookup[f1_f2_dt] = (
+                np.concatenate(
+                    [s_ids, np.full(len(group), new_song_id, dtype=s_ids.dtype)]
+                ),
+                np.concatenate([t1s_arr, group.astype(t1s_arr.dtype)]),
+            )
+        else:
+            bucket.extend(
+                (new_song_id, t1) for t1 in sorted_t1s[start:end].tolist()
+            )
 
     db.song_id_to_name[new_song_id] = song_name
 
     return db
 
 
+def stop_fingerprints(db: Database, frac: float = 0.001) -> FrozenSet[int]:
+    """Identify 'stop-hashes': fingerprints so common across the database
+    that they carry no discriminating information.
+
+    Fingerprint frequencies are Zipfian -- a tiny number of keys occur in a
+    huge number of songs -- and every hit in such a bucket is processed at
+    query time while adding essentially no signal to the vote tally.
+    Compute this set once after all songs are ingested and pass it to
+    `match_samples` / `fingerprints_to_matches` to skip those buckets.
+
+    Parameters
+    ----------
+    db : Database
+        An in-memory database (list-layout or finalized buckets).
+
+    frac : float, optional (default=0.001)
+        A bucket is a stop-hash if it holds more than `frac` of all the
+        fingerprint entries in the database.
+
+    Returns
+    -------
+    FrozenSet[int]
+        The packed keys of the stop-hash buckets."""
+    bucket_sizes = {
+        f1_f2_dt: (len(bucket[0]) if isinstance(bucket, tuple) else len(bucket))
+        for f1_f2_dt, bucket in db.fp_lookup.items()
+    }
+    threshold = frac * sum(bucket_sizes.values())
+    return frozenset(
+        f1_f2_dt for f1_f2_dt, size in bucket_sizes.items() if size > threshold
+    )
+
+
+def delete_song_from_database(song_id: SongId, db: Database) -> Database:
+    """Remove a song's name and all of its fingerprint entries from the
+    database.
+
+    Each affected bucket is rebuilt by filtering, rather than by removing
+    entries in place while iterating -- which would both skip entries and
+    cost O(bucket-size) per removal. Buckets left empty are dropped.
+
+    Parameters
+    ----------
+    song_id : SongId
+        The ID of the song to remove.
+
+    db : Database
+
+    Returns
+    -------
+    db : Database"""
+    emptied_keys = []
+    for f1_f2_dt, bucket in db.fp_lookup.items():
+        if isinstance(bucket, tuple):
+            # finalized bucket: filter the (song-IDs, t1s) array pair with
+            # one vectorized mask
+            s_ids, t1s = bucket
+            keep = s_ids != song_id
+            if keep.all():
+                continue
+            filtered: FpBucket = (s_ids[keep], t1s[keep])
+            bucket_empty = not keep.any()
+        else:
+            filtered = [entry for entry in bucket if entry[0] != song_id]
+            if len(filtered) == len(bucket):
+                continue
+            bucket_empty = not filtered
+
+        if bucket_empty:
+            emptied_keys.append(f1_f2_dt)
+        else:
+            db.fp_lookup[f1_f2_dt] = filtered
+
+    for f1_f2_dt in emptied_keys:
+        del db.fp_lookup[f1_f2_dt]
+
+    db.song_id_to_name.pop(song_id, None)
+    return db
+
+
 def fingerprints_to_matches(
-    sample_fingerprints: Iterable[Tuple[Tuple[int, int, int], int]],
+    sample_fingerprints: Iterable[Tuple[int, int]],
     db: Database,
+    stop_fps: Optional[FrozenSet[int]] = None,
 ) -> Iterable[Tuple[SongId, int]]:
     """Generates database matches from all of a sample's fingerprints.
 
     Parameters
     ----------
-    sample_fingerprints : Iterable[Tuple[Tuple[int, int, int], int]]
-        ((f_{n}, f_{n+j}, dt), t_{n})
-        The frequency value of peak n and peak n+j, along with the time at which peak n occurred.
+    sample_fingerprints : Iterable[Tuple[int, int]]
+        (packed-fingerprint, t_{n})
+        The packed (f_{n}, f_{n+j}, dt) fingerprint -- see
+        `fingerprints.pack_fingerprint` -- along with the time at which
+        peak n occurred.
 
     db : Database
         Our database
 
+    stop_fps : Optional[FrozenSet[int]]
+        Stop-hash keys to skip -- see `stop_fingerprints`.
+
     Yields
     ------
     Tuple[song_ID, dt]
@@ -119,44 +497,138 @@ def fingerprints_to_matches(
     --------
     fingerprints.peaks_to_fingerprints"""
     for f1_f2_dt, t_sample in sample_fingerprints:
+        if stop_fps is not None and f1_f2_dt in stop_fps:
+            continue
         match = db.fp_lookup.get(f1_f2_dt)
-        if match is not None:
+        if match is None:
+            continue
+        if isinstance(match, tuple):
+            # finalized bucket: a (song-IDs, t1s) array pair
+            s_ids, t_songs = match
+            for s_id, t_song in zip(s_ids.tolist(), t_songs.tolist()):
+                yield s_id, t_song - t_sample
+        else:
             for s_id, t_song in match:
                 yield s_id, t_song - t_sample
 
 
-def match_recording(listen_time: float, db: Database) -> Tuple[Union[str, None], int]:
-    """Records from a microphone and return the name of the matched song and the
-    number of matches from the database (i.e. the number of consistent (song-ID, dt)
-    occurences found in the top-match).
+def match_samples(
+    samples: np.ndarray,
+    sampling_rate: int,
+    db: Database,
+    stop_fps: Optional[FrozenSet[int]] = None,
+) -> Tuple[Union[str, None], int]:
+    """Query the database for the best match to an array of audio samples.
+
+    Each of the sample's fingerprints is matched against the database via
+    an O(1) dict lookup -- see `fingerprints_to_matches` -- so the total
+    query cost scales only with the number of sample fingerprints, not
+    with the size of the database.
 
     Parameters
     ----------
-    listen_time : float
+    samples : np.ndarray, shape-(N,)
+        The digital samples to query the database with.
+
+    sampling_rate : int
+        The sampling rate used to produce `samples`
 
     db : Database
 
+    stop_fps : Optional[FrozenSet[int]]
+        Stop-hash keys to skip -- see `stop_fingerprints`. Filtering these
+        Zipf-frequent fingerprints avoids scanning the database's largest,
+        least-informative buckets.
+
     Returns
     -------
     (song-name, num-matches)
         If no match, then song-name is `None`.
+
+    Notes
+    -----
+    Votes are tallied per (song-ID, dt) pair rather than per song-ID.
+    Counting bare song-IDs would let a long song win simply by sharing
+    many unrelated peak-pair signatures with the sample; requiring the
+    matches to agree on a single time-offset `dt` means that only
+    signatures occurring in the same relative alignment count towards
+    the winning tally.
     """
-    from audio import get_digital_recording
-    from fingerprints import digital_to_spec, local_peaks, peaks_to_fingerprints
+    from fingerprints import digital_to_spec, local_peaks, peaks_to_fingerprint_arrays
 
-    samples, sampling_rate = get_digital_recording(listen_time)
     log_spec, threshold_amp = digital_to_spec(samples, sampling_rate)
     time_freq_peak_locations = local_peaks(log_spec, threshold_amp)
-    fingerprints = peaks_to_fingerprints(time_freq_peak_locations)
-    matches = fingerprints_to_matches(fingerprints, db=db)
-
-    # find most consistent match
-    cntr = Counter(matches)  # counts (song-ID, dt) occurrences
-    if not cntr:
+    keys, t1s = peaks_to_fingerprint_arrays(time_freq_peak_locations)
+    fingerprints = zip(keys.tolist(), t1s.tolist())
+
+    # Tally the (song-ID, dt) votes directly rather than passing a generator
+    # of tuples to `Counter`: the lookup loop is inlined here (no generator
+    # frame to resume per match) and each vote is keyed on a single packed
+    # 64-bit int instead of a freshly-allocated 2-tuple. Song-IDs are the
+    # small non-negative ints produced by `add_song_to_database`, so they
+    # pack safely into the upper 32 bits.
+    counts: Dict[int, int] = {}
+    packed_votes: List[np.ndarray] = []
+    fp_lookup = db.fp_lookup
+    for f1_f2_dt, t_sample in fingerprints:
+        if stop_fps is not None and f1_f2_dt in stop_fps:
+            continue
+        hits = fp_lookup.get(f1_f2_dt)
+        if hits is None:
+            continue
+        if isinstance(hits, tuple):
+            # finalized bucket: pack the whole (song-IDs, t1s) array pair
+            # with one vectorized expression and defer the tallying
+            s_ids, t_songs = hits
+            packed_votes.append(
+                (s_ids.astype(np.int64) << 32)
+                | ((t_songs.astype(np.int64) - t_sample) & 0xFFFFFFFF)
+            )
+        else:
+            for s_id, t_song in hits:
+                key = (s_id << 32) | ((t_song - t_sample) & 0xFFFFFFFF)
+                counts[key] = counts.get(key, 0) + 1
+
+    if packed_votes:
+        # Histogram all the deferred votes in C: one concatenated int64
+        # buffer, one np.unique over it. This replaces a Python dict update
+        # per match, which dominates query time at database scale.
+        keys, key_counts = np.unique(np.concatenate(packed_votes), return_counts=True)
+        if not counts:
+            best = int(key_counts.argmax())
+            return db.song_id_to_name[int(keys[best]) >> 32], int(key_counts[best])
+        # a partially-finalized database: fold the array tally into the dict
+        for key, num in zip(keys.tolist(), key_counts.tolist()):
+            counts[key] = counts.get(key, 0) + num
+
+    if not counts:
         # no matches!
         return None, 0
 
     # We could modify this to return the top-k matches to analyze our
     # results -- e.g., how close was the 2nd-best match?
-    (top_song_id, dt), num_matches = cntr.most_common(1)[0]
-    return db.song_id_to_name[top_song_id], num_matches
+    best_key = max(counts, key=counts.__getitem__)
+    top_song_id = best_key >> 32
+    return db.song_id_to_name[top_song_id], counts[best_key]
+
+
+def match_recording(listen_time: float, db: Database) -> Tuple[Union[str, None], int]:
+    """Records from a microphone and return the name of the matched song and the
+    number of matches from the database (i.e. the number of consistent (song-ID, dt)
+    occurences found in the top-match).
+
+    Parameters
+    ----------
+    listen_time : float
+
+    db : Database
+
+    Returns
+    -------
+    (song-name, num-matches)
+        If no match, then song-name is `None`.
+    """
+    from audio import get_digital_recording
+
+    samples, sampling_rate = get_digital_recording(listen_time)
+    return match_samples(samples, sampling_rate, db)
@@ -10,8 +10,76 @@ from typing import Iterable, List, Sequence, Tuple
 import defaults
 import matplotlib.mlab as mlab
 import numpy as np
-from numba import njit
-from scipy.ndimage.morphology import generate_binary_structure, iterate_structure
+from numpy.lib.stride_tricks import sliding_window_view
+from numba import njit, prange
+from scipy.ndimage import generate_binary_structure, iterate_structure, maximum_filter
+from scipy.signal import stft
+
+
+# The spectrogram is clipped to this value before the log is taken, so that
+# its smallest value never falls below it -- log(0) is undefined
+_AMP_CLIP_FLOOR = 1e-20
+
+# log-amplitudes therefore all lie in [log(_AMP_CLIP_FLOOR), max); this known
+# lower bound lets the cutoff histogram be built without a separate min pass
+_LOG_FLOOR = float(np.log(_AMP_CLIP_FLOOR))
+
+# Number of buckets used by the histogram-based percentile selection. The
+# resulting cutoff is accurate to one bucket-width in log-amplitude, which is
+# well below the intrinsic noise of the spectrogram.
+_CUTOFF_HIST_BINS = 1024
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _clip_log(S: np.ndarray) -> float:
+    """Clip `S` to the amplitude floor and replace it with its natural log,
+    in-place and in a single pass. Returns the maximum of the logged values.
+
+    Fusing the clip and the log means the ~64 MB spectrogram of a full song
+    crosses the memory bus once instead of twice; the max falls out of the
+    same pass for free.
+    """
+    H, W = S.shape
+    row_max = np.empty(H)
+    for r in prange(H):
+        m = -np.inf
+        for c in range(W):
+            x = S[r, c]
+            if x < _AMP_CLIP_FLOOR:
+                x = _AMP_CLIP_FLOOR
+            x = np.log(x)
+            S[r, c] = x
+            if x > m:
+                m = x
+        row_max[r] = m
+    return row_max.max()
+
+
+@njit(fastmath=True, cache=True)
+def _log_amp_histogram(S: np.ndarray, lo: float, hi: float, n_bins: int) -> np.ndarray:
+    """Histogram the elements of `S` into `n_bins` equal-width buckets
+    spanning [lo, hi]. One serial read pass; no temporaries."""
+    hist = np.zeros(n_bins, dtype=np.int64)
+    scale = n_bins / (hi - lo)
+    flat = S.ravel()
+    for i in range(flat.size):
+        b = int((flat[i] - lo) * scale)
+        if b >= n_bins:
+            b = n_bins - 1
+        hist[b] += 1
+    return hist
+
+
+def _percentile_cutoff(log_spectrogram: np.ndarray, log_max: float, frac_cut: float) -> float:
+    """Pick the amplitude that (approximately) excludes the bottom `frac_cut`
+    of a log-scaled spectrogram, via the CDF of a fixed-width histogram."""
+    if log_max <= _LOG_FLOOR:
+        # degenerate spectrogram: everything was clipped to the floor
+        return _LOG_FLOOR
+    hist = _log_amp_histogram(log_spectrogram, _LOG_FLOOR, log_max, _CUTOFF_HIST_BINS)
+    bin_index = int(np.searchsorted(np.cumsum(hist), frac_cut * log_spectrogram.size))
+    bin_width = (log_max - _LOG_FLOOR) / _CUTOFF_HIST_BINS
+    return _LOG_FLOOR + (bin_index + 1) * bin_width
 
 
 def digital_to_spec(
@@ -36,8 +104,9 @@ def digital_to_spec(
     Returns
     -------
     Union[Tuple[numpy.ndarray, float]]
-        The log-scaled spectrogram and the spectrogram element that partitions the
-        bottom `frac_cut` elements in the spectrogram from the top elements.
+        The log-scaled spectrogram (float32) and the amplitude that (approximately)
+        partitions the bottom `frac_cut` elements in the spectrogram from the
+        top elements.
     """
     assert 0.0 <= frac_cut <= 1.0
 
@@ -49,26 +118,84 @@ def digital_to_spec(
         noverlap=int(defaults.NFFT / 2),
     )
 
+    # Quantize the spectrogram to float32 before any further processing:
+    # peak finding is memory-bound, and log-amplitudes need nowhere near the
+    # 53-bit mantissa of the float64 that mlab.specgram returns, so halving
+    # the element size halves the DRAM traffic of every pass that follows.
+    # (float16 would quarter it, but neither scipy.ndimage nor Numba-on-CPU
+    # accepts float16 arrays.)
+    S = S.astype(np.float32)
+
     # log-scaled Fourier amplitudes have a much more gradual distribution
     # for audio data.
     #
-    # We need to clip the spectrogram before taking the log so that its
-    # smallest value does not fall below `1e-20` because log(0) is undefined
-    np.clip(S, a_min=1e-20, a_max=None, out=S)  # clip in-place
-    np.log(S, out=S)  # take the log in-place
+    # The clip (so that log(0) is never taken) and the log are fused into a
+    # single in-place pass over S, which also yields the max logged value.
+    log_max = _clip_log(S)
+
+    # Compute the percentile-based threshold amplitude from a histogram CDF
+    # rather than a partition, which would have to copy the spectrogram to
+    # avoid scrambling it. The cutoff is approximate to within one
+    # bucket-width of log-amplitude.
+    return S, _percentile_cutoff(S, log_max, frac_cut)
+
+
+def digital_to_specs_batched(
+    clips: np.ndarray, fs: float, frac_cut: float = defaults.MIN_FRAC_AMP_CUTOFF
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched counterpart to `digital_to_spec` for a stack of equal-length
+    clips (e.g. the output of `audio.random_clips`).
+
+    All of the clips go through a single `scipy.signal.stft` call, which
+    broadcasts over the leading batch axis -- the window and FFT setup are
+    shared across the batch instead of being rebuilt per clip. The batched
+    spectrograms carry a different fixed scaling than `digital_to_spec`'s
+    (log-magnitude vs. log-power, and differing window normalization), but
+    peak locations and the percentile cutoff are invariant to any constant
+    rescaling, so fingerprints from either path match one another.
 
-    # Compute percentile-based threshold amplitude; this is greatly optimized by
-    # leveraging the apt numpy.partition function.
-    cutoff_index = int(frac_cut * S.size)
-    cutoff = np.partition(S.ravel(), cutoff_index)[cutoff_index]
+    Parameters
+    ----------
+    clips : numpy.ndarray, shape-(B, Ts)
+        A batch of B equal-length clips of digital samples, one per row.
 
-    return S, cutoff
+    fs : float
+        The sample-frequency used to create the digital signals.
 
+    frac_cut : float
+        The fractional portion of intensities for which the cutoff is selected.
 
-@njit
-def _peaks(
-    data_2d: np.ndarray, row_deltas: np.ndarray, col_deltas: np.ndarray, amp_min: float
-) -> List[Tuple[int, int]]:
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        The shape-(B, n_freq, n_time) float32 log-scaled spectrograms and the
+        shape-(B,) per-clip cutoff amplitudes.
+    """
+    assert 0.0 <= frac_cut <= 1.0
+    assert clips.ndim == 2
+
+    _, _, S = stft(
+        clips,
+        fs=fs,
+        nperseg=defaults.NFFT,
+        noverlap=defaults.NFFT // 2,
+        boundary=None,
+        padded=False,
+        axis=-1,
+    )
+    S = np.abs(S).astype(np.float32)
+
+    # B is small, so each slice just reuses the fused 2-D clip+log kernel
+    # and histogram-based cutoff selection from the unbatched path
+    cutoffs = np.empty(len(S))
+    for i in range(len(S)):
+        log_max = _clip_log(S[i])
+        cutoffs[i] = _percentile_cutoff(S[i], log_max, frac_cut)
+    return S, cutoffs
+
+
+@njit(parallel=True, boundscheck=False, fastmath=True, cache=True)
+def _peaks(data_2d: np.ndarray, deltas: np.ndarray, amp_min: float) -> np.ndarray:
     """
     A Numba-optimized 2-D peak-finding algorithm.
 
@@ -77,67 +204,62 @@ def _peaks(
     data_2d : numpy.ndarray, shape-(H, W)
         The 2D array of data in which local peaks will be detected.
 
-    row_deltas : numpy.ndarray, shape-(N,)
-        The row-index offsets used to traverse the local neighborhood,
-        relative to some element at location (row, col).
+    deltas : numpy.ndarray, shape-(N, 2), dtype=int32
+        The (row, col) index offsets used to traverse the local neighborhood,
+        relative to some element at location (row, col). Must not contain the
+        (0, 0) offset, which would compare an element with itself.
 
-        E.g. (row + row_deltas[0], col + col_deltas[0]) will move to the
+        E.g. (row + deltas[0, 0], col + deltas[0, 1]) will move to the
         first spot in the local neighborhood
 
-    col_deltas : numpy.ndarray, shape-(N,)
-        The col-index offsets used to traverse the local neighborhood,
-        relative to some element at location (row, col).
-
     amp_min : float
         All amplitudes at and below this value are excluded from being local
         peaks.
 
     Returns
     -------
-    List[Tuple[int, int]]
-        (col, row) index pair for each local peak location.
+    numpy.ndarray, shape-(H, W), dtype=bool
+        A mask that is True wherever `data_2d` holds a local peak.
     """
-    peaks = []  # stores the (row, col) locations of all the local peaks
-
-    # Iterate over the 2-D data in col-major order
-    # we want to see if there is a local peak located at
-    # row=r, col=c
-    for c, r in np.ndindex(*data_2d.shape[::-1]):
-        if data_2d[r, c] <= amp_min:
-            # The amplitude falls beneath the minimum threshold
-            # thus this can't be a peak.
-            continue
-
-        # Iterating over the neighborhood centered on (r, c)
-        # dr: displacement from r
-        # dc: discplacement from c
-        for dr, dc in zip(row_deltas, col_deltas):
-            if dr == 0 and dc == 0:
-                # This would compare (r, c) with itself.. skip!
-                continue
-
-            if not (0 <= r + dr < data_2d.shape[0]):
-                # neighbor falls outside of boundary
-                continue
-
-            if not (0 <= c + dc < data_2d.shape[1]):
-                # neighbor falls outside of boundary
+    # Hoisting the shape into locals and iterating in row-major order keeps
+    # the scans unit-strided through the C-contiguous spectrogram, instead of
+    # jumping a full row's worth of memory on every step.
+    H, W = data_2d.shape
+    n_deltas = deltas.shape[0]
+
+    # Peak detection is embarrassingly parallel across rows: each prange
+    # iteration only reads the (shared) spectrogram and writes to its own
+    # row of the mask, so there is no contention between threads.
+    peaks_mask = np.zeros((H, W), dtype=np.bool_)
+
+    # we want to see if there is a local peak located at row=r, col=c
+    for r in prange(H):
+        for c in range(W):
+            center = data_2d[r, c]
+            if center <= amp_min:
+                # The amplitude falls beneath the minimum threshold
+                # thus this can't be a peak.
                 continue
 
-            if data_2d[r, c] < data_2d[r + dr, c + dc]:
-                # One of the amplitudes within the neighborhood
-                # is larger, thus data_2d[r, c] cannot be a peak
-                break
-        else:
-            # if we did not break from the for-loop then (r, c) is a peak
-            peaks.append((c, r))  # <- note col, row ordering
-    return peaks
+            # Iterating over the neighborhood centered on (r, c)
+            is_peak = True
+            for k in range(n_deltas):
+                rr = r + deltas[k, 0]
+                cc = c + deltas[k, 1]
+                # Neighbors outside of the boundary are skipped; an in-bounds
+                # neighbor with a larger amplitude means (r, c) is not a peak
+                if 0 <= rr < H and 0 <= cc < W and center < data_2d[rr, cc]:
+                    is_peak = False
+                    break
+            peaks_mask[r, c] = is_peak
+    return peaks_mask
 
 
 def local_peaks(
     log_spectrogram: np.ndarray,
     amp_min: float,
     p_nn: int = defaults.LOCAL_PEAK_NN_RADIUS,
+    use_scipy: bool = True,
 ) -> List[Tuple[int, int]]:
     """
     Defines a local neighborhood and finds the local peaks
@@ -157,6 +279,12 @@ def local_peaks(
         The neighborhood radius used for determining if a spectrogram value
         is a local peak. Specified in spectrogram cells.
 
+    use_scipy : bool, optional (default=True)
+        If True, peaks are found via `scipy.ndimage.maximum_filter`, which
+        sweeps the neighborhood over the spectrogram in a single pass of
+        compiled C code. Otherwise the Numba-compiled `_peaks` kernel is
+        used; both produce identical peaks.
+
     Returns
     -------
     List[Tuple[int, int]]
@@ -182,13 +310,6 @@ def local_peaks(
     assert neighborhood.shape[0] % 2 == 1
     assert neighborhood.shape[1] % 2 == 1
 
-    # the row and column indices where our neighborhood contains `True`
-    rows, cols = np.where(neighborhood)
-
-    # center neighborhood indices around center of neighborhood
-    rows -= neighborhood.shape[0] // 2
-    cols -= neighborhood.shape[1] // 2
-
     # Extract peaks; encoded in terms of time and freq bin indices.
     # dt and df are always the same size for the spectrogram that is produced,
     # so the bin indices consistently map to the same physical units:
@@ -196,14 +317,113 @@ def local_peaks(
     # Thus we can codify our peaks with integer bin indices, (n, m) instead of their
     # physical (t, f) coordinates. This makes storage and compression of peak
     # locations much simpler.
-    time_freq_peak_locations = _peaks(log_spectrogram, rows, cols, amp_min=amp_min)
+    if use_scipy:
+        # An element is a local peak iff it matches the max over its
+        # neighborhood; `maximum_filter` computes that max everywhere in one
+        # C-level raster scan. Out-of-bounds neighbors are treated as -inf so
+        # that they can never suppress a peak, matching the bounds-checks in
+        # `_peaks`.
+        local_max = maximum_filter(
+            log_spectrogram, footprint=neighborhood, mode="constant", cval=-np.inf
+        )
+        peaks_mask = (log_spectrogram == local_max) & (log_spectrogram > amp_min)
+
+        # Transposing the mask before `np.where` yields the peaks in
+        # column-major (time-ordered) traversal of the spectrogram.
+        times, freqs = np.where(peaks_mask.T)
+        return list(zip(times.tolist(), freqs.tolist()))
 
-    return time_freq_peak_locations
+    # the row and column indices where our neighborhood contains `True`
+    rows, cols = np.where(neighborhood)
+
+    # center neighborhood indices around center of neighborhood
+    rows -= neighborhood.shape[0] // 2
+    cols -= neighborhood.shape[1] // 2
+
+    # Pack the offsets into a single contiguous shape-(N, 2) int32 array for
+    # unit-stride access in the kernel, dropping the (0, 0) self-comparison
+    # up front rather than re-testing for it on every neighbor visit.
+    not_center = (rows != 0) | (cols != 0)
+    deltas = np.stack([rows[not_center], cols[not_center]], axis=1).astype(np.int32)
+
+    # The kernel fills a peak mask in parallel across rows; extracting
+    # (time, freq) pairs from the transposed mask restores the time-ordered
+    # output, just as in the scipy path above.
+    peaks_mask = _peaks(log_spectrogram, deltas, amp_min=amp_min)
+    times, freqs = np.where(peaks_mask.T)
+    return list(zip(times.tolist(), freqs.tolist()))
+
+
+def local_peaks_batched(
+    log_spectrograms: np.ndarray,
+    amp_mins: np.ndarray,
+    p_nn: int = defaults.LOCAL_PEAK_NN_RADIUS,
+) -> List[List[Tuple[int, int]]]:
+    """
+    Find the local peaks in a batch of spectrograms with one filter pass.
+
+    Giving the 2-D neighborhood a singleton leading axis lets
+    `maximum_filter` sweep the whole shape-(B, n_freq, n_time) stack in one
+    memory stream without ever comparing cells across different clips.
+
+    Parameters
+    ----------
+    log_spectrograms : numpy.ndarray, shape=(B, n_freq, n_time)
+        A batch of log-scaled spectrograms, e.g. from
+        `digital_to_specs_batched`.
+
+    amp_mins : numpy.ndarray, shape-(B,)
+        The per-clip amplitude threshold applied to local maxima.
+
+    p_nn : int
+        The neighborhood radius used for determining if a spectrogram value
+        is a local peak. Specified in spectrogram cells.
+
+    Returns
+    -------
+    List[List[Tuple[int, int]]]
+        For each clip, the time and frequency index-values of its local
+        peaks, ordered as in `local_peaks`.
+    """
+    struct = generate_binary_structure(2, 1)
+    neighborhood = np.asarray(iterate_structure(struct, p_nn))
+    amp_mins = np.asarray(amp_mins)
+
+    local_max = maximum_filter(
+        log_spectrograms,
+        footprint=neighborhood[None],
+        mode="constant",
+        cval=-np.inf,
+    )
+    peaks_mask = (log_spectrograms == local_max) & (
+        log_spectrograms > amp_mins[:, None, None]
+    )
+
+    all_peaks = []
+    for clip_mask in peaks_mask:
+        times, freqs = np.where(clip_mask.T)
+        all_peaks.append(list(zip(times.tolist(), freqs.tolist())))
+    return all_peaks
+
+
+def pack_fingerprint(f1: int, f2: int, dt: int) -> int:
+    """Pack a fingerprint's (f1, f2, dt) components into one 64-bit int.
+
+    All three components are small non-negative integers (freq bins are at
+    most NFFT/2 + 1 = 2049; dt is bounded by the spectrogram length), so
+    they fit losslessly in the layout
+
+        | dt : 22 bits | f2 : 21 bits | f1 : 21 bits |
+
+    A single int key hashes in one shot and occupies one machine word,
+    whereas a (f1, f2, dt) tuple key costs three boxed ints plus a
+    composite tuple hash per lookup."""
+    return (f1 & 0x1FFFFF) | ((f2 & 0x1FFFFF) << 21) | ((dt & 0x3FFFFF) << 42)
 
 
 def peaks_to_fingerprints(
     peaks: Sequence[Tuple[int, int]], fan_value: int = defaults.FINGERPRINT_FANOUT
-) -> Iterable[Tuple[Tuple[int, int, int], int]]:
+) -> Iterable[Tuple[int, int]]:
     """Given the time-frequency locations of spectrogram peaks, generates
     'fingerprint' features.
 
@@ -218,10 +438,11 @@ def peaks_to_fingerprints(
 
     Yields
     ------
-    Tuple[Tuple[int, int, int], int]
-        ((f_{n}, f_{n+j}, t_{n+j} - t_{n}), t_{n})
-        The frequency value of peak n, peak n+j, their time-offset, along with the
-        time at which peak n occurred.
+    Tuple[int, int]
+        (packed-fingerprint, t_{n})
+        The frequency value of peak n, peak n+j, and their time-offset,
+        packed into a single 64-bit int -- see `pack_fingerprint` -- along
+        with the time at which peak n occurred.
 
     Notes
     -----
@@ -235,7 +456,7 @@ def peaks_to_fingerprints(
     <generator>
 
     >>> list(peaks_to_fingerprints(peaks, 15))
-    [((2, 3, 5), 10), ((12, 4, 5), 16), ....]
+    [(21990238846978, 10), (21990240944140, 16), ....]
 
     Using a generator is nice because we might be producing
     a lot of fingerprints, and this enables use to consume/count
@@ -245,4 +466,73 @@ def peaks_to_fingerprints(
     assert 1 <= fan_value
     for n, (t1, f1) in enumerate(peaks):
         for t2, f2 in peaks[n + 1 : n + fan_value + 1]:
-            yield (f1, f2, t2 - t1), t1
+            yield pack_fingerprint(f1, f2, t2 - t1), t1
+
+
+def peaks_to_fingerprint_arrays(
+    peaks: Sequence[Tuple[int, int]], fan_value: int = defaults.FINGERPRINT_FANOUT
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized counterpart to `peaks_to_fingerprints`.
+
+    The fan-out pairing is a fixed-width stencil over the peak sequence, so
+    all peaks with a full complement of `fan_value` partners are paired and
+    packed with broadcast NumPy ops; only the ragged tail of the sequence
+    (the final `fan_value` peaks, which have fewer partners) falls back to
+    the scalar loop.
+
+    Parameters
+    ----------
+    peaks : Sequence[Tuple[int, int]]
+        A sequence of time-frequency pairs
+
+    fan_value : int, optional (uses global default)
+        Given a peak, `fan_value` indicates the number of subsequent peaks
+        to be used to form fingerprint features.
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Two parallel shape-(M,) int64 arrays: the packed fingerprints and
+        the corresponding t_{n} values, in the same order that
+        `peaks_to_fingerprints` yields them."""
+    assert 1 <= fan_value
+    num_peaks = len(peaks)
+
+    num_full = num_peaks - fan_value  # peaks with all `fan_value` partners
+    if num_full > 0:
+        peaks_arr = np.asarray(peaks, dtype=np.int64)
+        ts = peaks_arr[:, 0]
+        fs = peaks_arr[:, 1]
+
+        # row n of each window holds the partners of peak n: peaks n+1
+        # through n+fan_value
+        t2 = sliding_window_view(ts[1:], fan_value)[:num_full]
+        f2 = sliding_window_view(fs[1:], fan_value)[:num_full]
+        t1 = ts[:num_full, None]
+        f1 = fs[:num_full, None]
+
+        # `pack_fingerprint`, broadcast over the whole (num_full, fan_value)
+        # stencil at once
+        dt = t2 - t1
+        keys = (f1 & 0x1FFFFF) | ((f2 & 0x1FFFFF) << 21) | ((dt & 0x3FFFFF) << 42)
+        full_keys = keys.ravel()
+        full_t1s = np.broadcast_to(t1, keys.shape).ravel()
+    else:
+        num_full = 0
+        full_keys = np.empty(0, dtype=np.int64)
+        full_t1s = np.empty(0, dtype=np.int64)
+
+    # the ragged tail: fewer than `fan_value` partners apiece
+    tail = [
+        (pack_fingerprint(f1, f2, t2 - t1), t1)
+        for n, (t1, f1) in enumerate(peaks[num_full:], start=num_full)
+        for t2, f2 in peaks[n + 1 : n + fan_value + 1]
+    ]
+    if not tail:
+        return full_keys, full_t1s
+
+    tail_arr = np.asarray(tail, dtype=np.int64)
+    return (
+        np.concatenate([full_keys, tail_arr[:, 0]]),
+        np.concatenate([full_t1s, tail_arr[:, 1]]),
+    )